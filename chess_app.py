@@ -1,7 +1,14 @@
 import pygame
+import array
 import os
+import random
 import sys
 
+try:
+    import numba
+except ImportError:  # numba is optional; move generation then runs as plain Python
+    numba = None
+
 # Initialize pygame
 pygame.init()
 
@@ -9,7 +16,7 @@ pygame.init()
 WIDTH, HEIGHT = 600, 600
 BOARD_SIZE = 8
 SQUARE_SIZE = WIDTH // BOARD_SIZE
-FPS = 30
+EVENT_TIMEOUT = 100  # Milliseconds the main loop sleeps waiting for input
 
 # Colors
 WHITE = (255, 255, 255)
@@ -33,29 +40,255 @@ INITIAL_BOARD = [
     ['R', 'N', 'B', 'Q', 'K', 'B', 'N', 'R']
 ]
 
+# Flat 64-square board of piece character codes, indexed row * BOARD_SIZE + col
+EMPTY = ord(' ')
+INITIAL_SQUARES = array.array('b', [ord(piece) for row in INITIAL_BOARD for piece in row])
+
+# Piece letters in bitboard order (white first, then black)
+PIECES = 'PRNBQKprnbqk'
+
+# Integer piece types used by the move generators, in the same order as PIECES
+PAWN, ROOK, KNIGHT, BISHOP, QUEEN, KING = range(6)
+PIECE_TYPES = {piece: i % 6 for i, piece in enumerate(PIECES)}
+
+# Zobrist keys: one random 64-bit number per piece and square, per lost castling
+# right and for black to move. XOR-ing together the keys that apply gives a
+# position hash that can be updated incrementally as pieces move.
+ZOBRIST = {piece: [random.getrandbits(64) for _ in range(64)] for piece in PIECES}
+ZOBRIST_CASTLING = {
+    color: {right: random.getrandbits(64) for right in ('kingside', 'queenside', 'king_moved')}
+    for color in ('white', 'black')
+}
+ZOBRIST_BLACK_TO_MOVE = random.getrandbits(64)
+MOVE_CACHE_SIZE = 1024
+
+def square_bit(row, col):
+    """Return the bitboard bit for a square (a8 = bit 0, h1 = bit 63)"""
+    return 1 << (row * BOARD_SIZE + col)
+
+def build_bitboards(board):
+    """Build the piece/occupancy bitboards and Zobrist hash for a board layout"""
+    bb = {piece: 0 for piece in PIECES}
+    bb['all_white'] = 0
+    bb['all_black'] = 0
+    position_hash = 0
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            piece = board[row][col]
+            if piece != ' ':
+                bb[piece] |= square_bit(row, col)
+                bb['all_white' if piece < 'a' else 'all_black'] |= square_bit(row, col)
+                position_hash ^= ZOBRIST[piece][row * BOARD_SIZE + col]
+    return bb, position_hash
+
+INITIAL_BB, INITIAL_HASH = build_bitboards(INITIAL_BOARD)
+
+# Squares that must be empty for each castling move
+CASTLE_KS_WHITE_MASK = square_bit(7, 5) | square_bit(7, 6)
+CASTLE_QS_WHITE_MASK = square_bit(7, 1) | square_bit(7, 2) | square_bit(7, 3)
+CASTLE_KS_BLACK_MASK = square_bit(0, 5) | square_bit(0, 6)
+CASTLE_QS_BLACK_MASK = square_bit(0, 1) | square_bit(0, 2) | square_bit(0, 3)
+
+def bitboard_squares(bb):
+    """Yield the (row, col) of every set bit in a bitboard"""
+    while bb:
+        lsb = bb & -bb
+        yield divmod(lsb.bit_length() - 1, BOARD_SIZE)
+        bb ^= lsb
+
+def build_attack_table(offsets):
+    """Precompute a 64-entry table of on-board targets for fixed move offsets"""
+    table = [0] * (BOARD_SIZE * BOARD_SIZE)
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            for dr, dc in offsets:
+                r, c = row + dr, col + dc
+                if 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+                    table[row * BOARD_SIZE + col] |= square_bit(r, c)
+    return table
+
+# Move offsets and attack tables for the fixed-offset pieces
+KNIGHT_OFFSETS = (
+    (-2, -1), (-2, 1), (-1, -2), (-1, 2),
+    (1, -2), (1, 2), (2, -1), (2, 1)
+)
+KING_OFFSETS = (
+    (-1, -1), (-1, 0), (-1, 1),
+    (0, -1), (0, 1),
+    (1, -1), (1, 0), (1, 1)
+)
+KNIGHT_ATTACKS = build_attack_table(KNIGHT_OFFSETS)
+KING_ATTACKS = build_attack_table(KING_OFFSETS)
+
+# Ray directions as (row, col) steps; the first four run towards higher squares
+RAY_DIRECTIONS = ((0, 1), (1, 0), (1, 1), (1, -1), (0, -1), (-1, 0), (-1, -1), (-1, 1))
+ROOK_RAYS = (0, 1, 4, 5)
+BISHOP_RAYS = (2, 3, 6, 7)
+
+def build_ray_table(dr, dc):
+    """Precompute the squares reached from each square along one direction"""
+    table = [0] * (BOARD_SIZE * BOARD_SIZE)
+    for row in range(BOARD_SIZE):
+        for col in range(BOARD_SIZE):
+            r, c = row + dr, col + dc
+            while 0 <= r < BOARD_SIZE and 0 <= c < BOARD_SIZE:
+                table[row * BOARD_SIZE + col] |= square_bit(r, c)
+                r, c = r + dr, c + dc
+    return table
+
+RAY = [build_ray_table(dr, dc) for dr, dc in RAY_DIRECTIONS]
+
+def build_pawn_double_table(start_row, direction):
+    """Precompute the two-square pawn push target from each starting square"""
+    table = [0] * (BOARD_SIZE * BOARD_SIZE)
+    for col in range(BOARD_SIZE):
+        table[start_row * BOARD_SIZE + col] = square_bit(start_row + 2*direction, col)
+    return table
+
+# Pawn tables indexed [color][square], color 0 being white (moving up the board)
+PAWN_PUSH = [build_attack_table(((-1, 0),)), build_attack_table(((1, 0),))]
+PAWN_DOUBLE = [build_pawn_double_table(6, -1), build_pawn_double_table(1, 1)]
+PAWN_ATTACKS = [build_attack_table(((-1, -1), (-1, 1))), build_attack_table(((1, -1), (1, 1)))]
+
+# The move generators below take and return plain integers only, so numba can
+# compile them when it is installed. Under numba the tables become uint64 arrays
+# and bit scans use the native leading/trailing zero count instructions.
+if numba is None:
+    def jit(signature=None):
+        """Leave move generators as plain Python when numba is missing"""
+        return lambda func: func
+
+    def msb(bb):
+        """Index of the highest set bit"""
+        return bb.bit_length() - 1
+
+    def lsb(bb):
+        """Index of the lowest set bit"""
+        return (bb & -bb).bit_length() - 1
+else:
+    import numpy as np
+    from numba.cpython.unsafe.numbers import leading_zeros, trailing_zeros
+
+    def jit(signature=None):
+        """Compile a move generator with numba"""
+        if signature is None:
+            return numba.njit(cache=True, fastmath=False)
+        return numba.njit(signature, cache=True, fastmath=False)
+
+    @jit()
+    def msb(bb):
+        """Index of the highest set bit"""
+        return 63 - np.int64(leading_zeros(bb))
+
+    @jit()
+    def lsb(bb):
+        """Index of the lowest set bit"""
+        return np.int64(trailing_zeros(bb))
+
+    KNIGHT_ATTACKS = np.array(KNIGHT_ATTACKS, dtype=np.uint64)
+    KING_ATTACKS = np.array(KING_ATTACKS, dtype=np.uint64)
+    RAY = np.array(RAY, dtype=np.uint64)
+    PAWN_PUSH = np.array(PAWN_PUSH, dtype=np.uint64)
+    PAWN_DOUBLE = np.array(PAWN_DOUBLE, dtype=np.uint64)
+    PAWN_ATTACKS = np.array(PAWN_ATTACKS, dtype=np.uint64)
+
+@jit()
+def _ray_attacks(d, sq, occ):
+    """Squares along ray d from sq, up to and including the first blocker"""
+    ray = RAY[d][sq]
+    blockers = ray & occ
+    if blockers:
+        # Nearest blocker is the lowest bit on rising rays, the highest on falling ones
+        if d < 4:
+            ray ^= RAY[d][lsb(blockers)]
+        else:
+            ray ^= RAY[d][msb(blockers)]
+    return ray
+
+@jit()
+def _gen_rook(sq, own_occ, opp_occ):
+    """Rook moves from sq as a bitboard"""
+    occ = own_occ | opp_occ
+    attacks = (_ray_attacks(ROOK_RAYS[0], sq, occ) | _ray_attacks(ROOK_RAYS[1], sq, occ) |
+               _ray_attacks(ROOK_RAYS[2], sq, occ) | _ray_attacks(ROOK_RAYS[3], sq, occ))
+    return attacks & ~own_occ
+
+@jit()
+def _gen_bishop(sq, own_occ, opp_occ):
+    """Bishop moves from sq as a bitboard"""
+    occ = own_occ | opp_occ
+    attacks = (_ray_attacks(BISHOP_RAYS[0], sq, occ) | _ray_attacks(BISHOP_RAYS[1], sq, occ) |
+               _ray_attacks(BISHOP_RAYS[2], sq, occ) | _ray_attacks(BISHOP_RAYS[3], sq, occ))
+    return attacks & ~own_occ
+
+@jit()
+def _gen_knight(sq, own_occ):
+    """Knight moves from sq as a bitboard"""
+    return KNIGHT_ATTACKS[sq] & ~own_occ
+
+@jit()
+def _gen_king(sq, own_occ):
+    """King moves from sq as a bitboard (castling is handled by the caller)"""
+    return KING_ATTACKS[sq] & ~own_occ
+
+@jit()
+def _gen_pawn(sq, white, own_occ, opp_occ):
+    """Pawn pushes and captures from sq as a bitboard"""
+    color = 0 if white else 1
+    empty = ~(own_occ | opp_occ)
+    pushes = PAWN_PUSH[color][sq] & empty
+    if pushes:
+        # The double push needs the square in front to be empty as well
+        pushes |= PAWN_DOUBLE[color][sq] & empty
+    return pushes | (PAWN_ATTACKS[color][sq] & opp_occ)
+
+@jit('uint64(int64, int64, boolean, uint64, uint64)')
+def generate_moves(piece_type, sq, white, own_occ, opp_occ):
+    """Pseudo-legal moves for one piece as a bitboard"""
+    if piece_type == PAWN:
+        return _gen_pawn(sq, white, own_occ, opp_occ)
+    if piece_type == ROOK:
+        return _gen_rook(sq, own_occ, opp_occ)
+    if piece_type == KNIGHT:
+        return _gen_knight(sq, own_occ)
+    if piece_type == BISHOP:
+        return _gen_bishop(sq, own_occ, opp_occ)
+    if piece_type == QUEEN:
+        return _gen_rook(sq, own_occ, opp_occ) | _gen_bishop(sq, own_occ, opp_occ)
+    return _gen_king(sq, own_occ)
+
 class ChessGame:
     def __init__(self):
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
         pygame.display.set_caption("Python Chess")
-        self.clock = pygame.time.Clock()
+        self.move_cache = {}  # (position hash, square) -> moves, kept across games
+        self.large_font = pygame.font.SysFont('Arial', 48)
+        self.medium_font = pygame.font.SysFont('Arial', 32)
         self.load_images()
         self.reset_game()
         
     def load_images(self):
-        """Load chess piece images"""
+        """Load chess piece images and pre-render the empty board"""
+        # Draw the checkerboard once; frames blit from this surface
+        self.board_bg = pygame.Surface((WIDTH, HEIGHT)).convert()
+        for row in range(BOARD_SIZE):
+            for col in range(BOARD_SIZE):
+                color = LIGHT_SQUARE if (row + col) % 2 == 0 else DARK_SQUARE
+                pygame.draw.rect(self.board_bg, color, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        
         self.images = {}
-        pieces = ['P', 'R', 'N', 'B', 'Q', 'K', 'p', 'r', 'n', 'b', 'q', 'k']
         
         # First try to load from the 'images' subfolder if it exists
-        for piece in pieces:
+        for piece in PIECES:
             piece_path = os.path.join('images', f'{piece}.png')
             if os.path.exists(piece_path):
                 self.images[piece] = pygame.transform.scale(
-                    pygame.image.load(piece_path), (SQUARE_SIZE, SQUARE_SIZE)
+                    pygame.image.load(piece_path).convert_alpha(), (SQUARE_SIZE, SQUARE_SIZE)
                 )
         
         # If any images are missing, use colored rectangles with letters as fallback
-        for piece in pieces:
+        fallback_font = pygame.font.SysFont('Arial', SQUARE_SIZE // 2)
+        for piece in PIECES:
             if piece not in self.images:
                 # Create a surface with transparent background
                 surface = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
@@ -67,22 +300,26 @@ class ChessGame:
                     pygame.draw.rect(surface, (50, 50, 50, 200), (5, 5, SQUARE_SIZE-10, SQUARE_SIZE-10), border_radius=10)
                 
                 # Draw the letter on the rectangle
-                font = pygame.font.SysFont('Arial', SQUARE_SIZE // 2)
-                text = font.render(piece.upper(), True, BLACK if piece.isupper() else WHITE)
+                text = fallback_font.render(piece.upper(), True, BLACK if piece.isupper() else WHITE)
                 text_rect = text.get_rect(center=(SQUARE_SIZE//2, SQUARE_SIZE//2))
                 surface.blit(text, text_rect)
                 
-                self.images[piece] = surface
+                # Match the display's pixel format so blits skip conversion
+                self.images[piece] = surface.convert_alpha()
     
     def reset_game(self):
         """Reset the game to initial state"""
-        self.board = [row[:] for row in INITIAL_BOARD]  # Deep copy
+        self.board = array.array('b', INITIAL_SQUARES)  # Copy
         self.selected_piece = None
         self.turn = 'white'  # White goes first
         self.valid_moves = []
+        self.valid_moves_bb = 0  # Same moves as a bitboard for O(1) lookups
         self.game_over = False
         self.winner = None
+        self.game_over_surface = None  # Rendered once when the game ends
         self.check = False
+        self.white_king_alive = True
+        self.black_king_alive = True
         self.castling_rights = {
             'white': {'kingside': True, 'queenside': True},
             'white_king_moved': False,
@@ -91,9 +328,55 @@ class ChessGame:
         }
         self.move_history = []
         
+        # Rendering state: squares to repaint on the next frame
+        self.dirty = True
+        self.full_redraw = True
+        self.changed_squares = set()
+        
+        # One bitboard per piece type/color plus per-side occupancy, and the
+        # Zobrist hash of the position they describe
+        self.bb = dict(INITIAL_BB)
+        self.hash = INITIAL_HASH
+        
+    def toggle_piece(self, piece, row, col):
+        """Add or remove a piece in the bitboards and the position hash"""
+        sq = row * BOARD_SIZE + col
+        bit = 1 << sq
+        self.bb[piece] ^= bit
+        self.bb['all_white' if self.is_piece_white(piece) else 'all_black'] ^= bit
+        self.hash ^= ZOBRIST[piece][sq]
+    
+    def revoke_castling(self, color, right):
+        """Clear a castling right, folding the change into the position hash"""
+        if self.castling_rights[color][right]:
+            self.castling_rights[color][right] = False
+            self.hash ^= ZOBRIST_CASTLING[color][right]
+    
+    def mark_squares(self, squares):
+        """Queue squares for repainting on the next frame"""
+        self.changed_squares.update(squares)
+        self.dirty = True
+    
+    def mark_selection(self):
+        """Queue the selected square and its move markers for repainting"""
+        if self.selected_piece:
+            self.mark_squares([self.selected_piece])
+        self.mark_squares(self.valid_moves)
+    
+    def set_valid_moves(self, moves):
+        """Store the selected piece's moves as a list and as a bitboard"""
+        self.valid_moves = moves
+        self.valid_moves_bb = 0
+        for r, c in moves:
+            self.valid_moves_bb |= square_bit(r, c)
+    
     def is_piece_white(self, piece):
-        """Check if a piece is white"""
-        return piece.isupper()
+        """Check if a piece is white (uppercase letters sort before lowercase)"""
+        return piece < 'a'
+    
+    def is_own_piece(self, row, col):
+        """Check if the side to move has a piece on a square"""
+        return (self.bb['all_' + self.turn] >> (row * BOARD_SIZE + col)) & 1
     
     def is_valid_position(self, row, col):
         """Check if a position is valid on the board"""
@@ -103,7 +386,7 @@ class ChessGame:
         """Get the piece at a specific position"""
         if not self.is_valid_position(row, col):
             return None
-        return self.board[row][col]
+        return chr(self.board[row * BOARD_SIZE + col])
     
     def calculate_valid_moves(self, row, col):
         """Calculate valid moves for a piece"""
@@ -111,119 +394,58 @@ class ChessGame:
         if piece == ' ':
             return []
         
+        # Re-selecting a piece in an unchanged position is a dict lookup
+        sq = row * BOARD_SIZE + col
+        key = (self.hash, sq)
+        if key in self.move_cache:
+            return self.move_cache[key]
+        
         is_white = self.is_piece_white(piece)
-        moves = []
+        own_occ = self.bb['all_white'] if is_white else self.bb['all_black']
+        opp_occ = self.bb['all_black'] if is_white else self.bb['all_white']
+        moves_bb = generate_moves(PIECE_TYPES[piece], sq, is_white, own_occ, opp_occ)
         
-        # Pawn movement
-        if piece.upper() == 'P':
-            direction = -1 if is_white else 1
-            
-            # Move forward one square
-            if self.is_valid_position(row + direction, col) and self.board[row + direction][col] == ' ':
-                moves.append((row + direction, col))
-                
-                # Move forward two squares from starting position
-                if ((is_white and row == 6) or (not is_white and row == 1)) and \
-                   self.board[row + 2*direction][col] == ' ':
-                    moves.append((row + 2*direction, col))
-            
-            # Capture diagonally
-            for c_offset in [-1, 1]:
-                if self.is_valid_position(row + direction, col + c_offset):
-                    target = self.board[row + direction][col + c_offset]
-                    if target != ' ' and is_white != self.is_piece_white(target):
-                        moves.append((row + direction, col + c_offset))
-        
-        # Rook movement (and part of Queen)
-        if piece.upper() in ['R', 'Q']:
-            for dr, dc in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                for i in range(1, BOARD_SIZE):
-                    r, c = row + i*dr, col + i*dc
-                    if not self.is_valid_position(r, c):
-                        break
-                    target = self.board[r][c]
-                    if target == ' ':
-                        moves.append((r, c))
-                    else:
-                        if is_white != self.is_piece_white(target):
-                            moves.append((r, c))
-                        break
-        
-        # Bishop movement (and part of Queen)
-        if piece.upper() in ['B', 'Q']:
-            for dr, dc in [(1, 1), (1, -1), (-1, 1), (-1, -1)]:
-                for i in range(1, BOARD_SIZE):
-                    r, c = row + i*dr, col + i*dc
-                    if not self.is_valid_position(r, c):
-                        break
-                    target = self.board[r][c]
-                    if target == ' ':
-                        moves.append((r, c))
-                    else:
-                        if is_white != self.is_piece_white(target):
-                            moves.append((r, c))
-                        break
-        
-        # Knight movement
-        if piece.upper() == 'N':
-            knight_moves = [
-                (-2, -1), (-2, 1), (-1, -2), (-1, 2),
-                (1, -2), (1, 2), (2, -1), (2, 1)
-            ]
-            for dr, dc in knight_moves:
-                r, c = row + dr, col + dc
-                if self.is_valid_position(r, c):
-                    target = self.board[r][c]
-                    if target == ' ' or is_white != self.is_piece_white(target):
-                        moves.append((r, c))
-        
-        # King movement
-        if piece.upper() == 'K':
-            king_moves = [
-                (-1, -1), (-1, 0), (-1, 1),
-                (0, -1), (0, 1),
-                (1, -1), (1, 0), (1, 1)
-            ]
-            for dr, dc in king_moves:
-                r, c = row + dr, col + dc
-                if self.is_valid_position(r, c):
-                    target = self.board[r][c]
-                    if target == ' ' or is_white != self.is_piece_white(target):
-                        moves.append((r, c))
-            
-            # Castling
+        # Castling: the squares between king and rook must be empty
+        if piece in 'Kk':
+            occ = own_occ | opp_occ
             if is_white and not self.castling_rights['white_king_moved']:
                 # Kingside castling
                 if self.castling_rights['white']['kingside'] and \
-                   all(self.board[7][c] == ' ' for c in range(5, 7)) and \
-                   self.board[7][7] == 'R':
-                    moves.append((7, 6))  # King's final position after castling
+                   not occ & CASTLE_KS_WHITE_MASK and self.bb['R'] & square_bit(7, 7):
+                    moves_bb |= square_bit(7, 6)  # King's final position after castling
                 
                 # Queenside castling
                 if self.castling_rights['white']['queenside'] and \
-                   all(self.board[7][c] == ' ' for c in range(1, 4)) and \
-                   self.board[7][0] == 'R':
-                    moves.append((7, 2))  # King's final position after castling
+                   not occ & CASTLE_QS_WHITE_MASK and self.bb['R'] & square_bit(7, 0):
+                    moves_bb |= square_bit(7, 2)  # King's final position after castling
             
             elif not is_white and not self.castling_rights['black_king_moved']:
                 # Kingside castling
                 if self.castling_rights['black']['kingside'] and \
-                   all(self.board[0][c] == ' ' for c in range(5, 7)) and \
-                   self.board[0][7] == 'r':
-                    moves.append((0, 6))  # King's final position after castling
+                   not occ & CASTLE_KS_BLACK_MASK and self.bb['r'] & square_bit(0, 7):
+                    moves_bb |= square_bit(0, 6)  # King's final position after castling
                 
                 # Queenside castling
                 if self.castling_rights['black']['queenside'] and \
-                   all(self.board[0][c] == ' ' for c in range(1, 4)) and \
-                   self.board[0][0] == 'r':
-                    moves.append((0, 2))  # King's final position after castling
+                   not occ & CASTLE_QS_BLACK_MASK and self.bb['r'] & square_bit(0, 0):
+                    moves_bb |= square_bit(0, 2)  # King's final position after castling
         
+        moves = list(bitboard_squares(moves_bb))
+        if len(self.move_cache) >= MOVE_CACHE_SIZE:
+            del self.move_cache[next(iter(self.move_cache))]  # Evict the oldest entry
+        self.move_cache[key] = moves
         return moves
     
     def move_piece(self, from_row, from_col, to_row, to_col):
         """Move a piece on the board"""
-        piece = self.board[from_row][from_col]
-        captured_piece = self.board[to_row][to_col]
+        from_sq = from_row * BOARD_SIZE + from_col
+        to_sq = to_row * BOARD_SIZE + to_col
+        piece = chr(self.board[from_sq])
+        captured_piece = chr(self.board[to_sq])
+        if captured_piece == 'K':
+            self.white_king_alive = False
+        elif captured_piece == 'k':
+            self.black_king_alive = False
         
         # Store move in history
         self.move_history.append({
@@ -232,56 +454,71 @@ class ChessGame:
             'to': (to_row, to_col),
             'captured': captured_piece
         })
+        self.mark_squares([(from_row, from_col), (to_row, to_col)])
         
         # Handle castling
-        if piece.upper() == 'K' and abs(from_col - to_col) == 2:
+        if piece in 'Kk' and abs(from_col - to_col) == 2:
             # This is a castling move
             is_white = self.is_piece_white(piece)
             rook_row = 7 if is_white else 0
+            rook_base = rook_row * BOARD_SIZE
+            rook = 'R' if is_white else 'r'
+            self.mark_squares([(rook_row, c) for c in (0, 3, 5, 7)])
             
             # Kingside castling
             if to_col == 6:
                 # Move the rook as well
-                self.board[rook_row][5] = self.board[rook_row][7]  # Move rook
-                self.board[rook_row][7] = ' '  # Remove rook from original position
+                self.board[rook_base + 5] = self.board[rook_base + 7]  # Move rook
+                self.board[rook_base + 7] = EMPTY  # Remove rook from original position
+                self.toggle_piece(rook, rook_row, 7)
+                self.toggle_piece(rook, rook_row, 5)
             
             # Queenside castling
             elif to_col == 2:
                 # Move the rook as well
-                self.board[rook_row][3] = self.board[rook_row][0]  # Move rook
-                self.board[rook_row][0] = ' '  # Remove rook from original position
+                self.board[rook_base + 3] = self.board[rook_base]  # Move rook
+                self.board[rook_base] = EMPTY  # Remove rook from original position
+                self.toggle_piece(rook, rook_row, 0)
+                self.toggle_piece(rook, rook_row, 3)
         
         # Update castling rights
-        if piece.upper() == 'K':
-            if self.is_piece_white(piece):
-                self.castling_rights['white_king_moved'] = True
-            else:
-                self.castling_rights['black_king_moved'] = True
+        if piece in 'Kk':
+            color = 'white' if self.is_piece_white(piece) else 'black'
+            if not self.castling_rights[f'{color}_king_moved']:
+                self.castling_rights[f'{color}_king_moved'] = True
+                self.hash ^= ZOBRIST_CASTLING[color]['king_moved']
         
         # Update rook movement for castling rights
-        if piece.upper() == 'R':
+        if piece in 'Rr':
             is_white = self.is_piece_white(piece)
             if is_white:
                 if from_row == 7 and from_col == 0:  # Queenside rook
-                    self.castling_rights['white']['queenside'] = False
+                    self.revoke_castling('white', 'queenside')
                 elif from_row == 7 and from_col == 7:  # Kingside rook
-                    self.castling_rights['white']['kingside'] = False
+                    self.revoke_castling('white', 'kingside')
             else:
                 if from_row == 0 and from_col == 0:  # Queenside rook
-                    self.castling_rights['black']['queenside'] = False
+                    self.revoke_castling('black', 'queenside')
                 elif from_row == 0 and from_col == 7:  # Kingside rook
-                    self.castling_rights['black']['kingside'] = False
+                    self.revoke_castling('black', 'kingside')
+        
+        # Update the bitboards: clear the captured piece, then lift the mover
+        if captured_piece != ' ':
+            self.toggle_piece(captured_piece, to_row, to_col)
+        self.toggle_piece(piece, from_row, from_col)
         
         # Check for pawn promotion (simplified - always promotes to queen)
-        if piece.upper() == 'P' and (to_row == 0 or to_row == 7):
+        if piece in 'Pp' and (to_row == 0 or to_row == 7):
             piece = 'Q' if self.is_piece_white(piece) else 'q'
+        self.toggle_piece(piece, to_row, to_col)
         
         # Update the board
-        self.board[to_row][to_col] = piece
-        self.board[from_row][from_col] = ' '
+        self.board[to_sq] = ord(piece)
+        self.board[from_sq] = EMPTY
         
         # Switch turns
         self.turn = 'black' if self.turn == 'white' else 'white'
+        self.hash ^= ZOBRIST_BLACK_TO_MOVE
         
         # Check for checkmate (simplified)
         self.check_for_checkmate()
@@ -289,106 +526,137 @@ class ChessGame:
     def check_for_checkmate(self):
         """Check if the game is over (simplified)"""
         # This is a simplified version - a real chess app would need more logic
-        # For now, we'll just check if a king is missing
-        white_king_exists = any('K' in row for row in self.board)
-        black_king_exists = any('k' in row for row in self.board)
-        
-        if not white_king_exists:
+        # For now, we'll just check if a king has been captured
+        if not self.white_king_alive:
             self.game_over = True
             self.winner = 'black'
-        elif not black_king_exists:
+        elif not self.black_king_alive:
             self.game_over = True
             self.winner = 'white'
+        
+        # The game over overlay covers the whole board
+        if self.game_over:
+            self.game_over_surface = self.render_game_over()
+            self.full_redraw = True
+            self.dirty = True
     
     def handle_click(self, row, col):
         """Handle mouse click on the board"""
         if self.game_over:
             return
         
-        piece = self.get_piece_at(row, col)
+        # Clicking the selected piece again changes nothing
+        if self.selected_piece == (row, col):
+            return
         
-        # If a piece is already selected
-        if self.selected_piece:
+        self.mark_selection()
+        
+        # If a piece is selected and the clicked position is a valid move
+        if self.selected_piece and self.valid_moves_bb >> (row * BOARD_SIZE + col) & 1:
             sel_row, sel_col = self.selected_piece
-            
-            # Check if the clicked position is a valid move
-            if (row, col) in self.valid_moves:
-                self.move_piece(sel_row, sel_col, row, col)
-                self.selected_piece = None
-                self.valid_moves = []
-            else:
-                # If clicking on own piece, select it instead
-                if piece != ' ' and ((self.turn == 'white' and self.is_piece_white(piece)) or 
-                                   (self.turn == 'black' and not self.is_piece_white(piece))):
-                    self.selected_piece = (row, col)
-                    self.valid_moves = self.calculate_valid_moves(row, col)
-                else:
-                    # Clicking elsewhere deselects
-                    self.selected_piece = None
-                    self.valid_moves = []
+            self.move_piece(sel_row, sel_col, row, col)
+            self.selected_piece = None
+        
+        # If clicking on own piece, select it instead
+        elif self.is_own_piece(row, col):
+            self.selected_piece = (row, col)
+        
+        # Clicking elsewhere deselects
+        else:
+            self.selected_piece = None
         
-        # If no piece is selected yet
+        # Generate moves once for whatever ended up selected
+        if self.selected_piece:
+            self.set_valid_moves(self.calculate_valid_moves(row, col))
         else:
-            if piece != ' ' and ((self.turn == 'white' and self.is_piece_white(piece)) or 
-                               (self.turn == 'black' and not self.is_piece_white(piece))):
-                self.selected_piece = (row, col)
-                self.valid_moves = self.calculate_valid_moves(row, col)
+            self.set_valid_moves([])
+        self.mark_selection()
+    
+    def draw_square(self, row, col, clear=True):
+        """Draw a single square with its highlight and piece, returning its rect"""
+        rect = pygame.Rect(col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+        sq = row * BOARD_SIZE + col
+        
+        # Draw the square from the pre-rendered board
+        if clear:
+            self.screen.blit(self.board_bg, rect, rect)
+        
+        # Highlight selected piece
+        if self.selected_piece and self.selected_piece == (row, col):
+            pygame.draw.rect(self.screen, HIGHLIGHT, rect)
+        
+        # Highlight valid moves
+        if self.valid_moves_bb >> sq & 1:
+            pygame.draw.circle(self.screen, VALID_MOVE, rect.center, SQUARE_SIZE // 6)
+        
+        # Draw the piece
+        piece = self.board[sq]
+        if piece != EMPTY:
+            piece_img = self.images[chr(piece)]
+            self.screen.blit(piece_img, rect)
+        
+        return rect
     
     def draw_board(self):
-        """Draw the chess board"""
-        for row in range(BOARD_SIZE):
-            for col in range(BOARD_SIZE):
-                # Draw the square
-                color = LIGHT_SQUARE if (row + col) % 2 == 0 else DARK_SQUARE
-                pygame.draw.rect(self.screen, color, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-                
-                # Highlight selected piece
-                if self.selected_piece and self.selected_piece == (row, col):
-                    pygame.draw.rect(self.screen, HIGHLIGHT, (col * SQUARE_SIZE, row * SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-                
-                # Highlight valid moves
-                if (row, col) in self.valid_moves:
-                    pygame.draw.circle(self.screen, VALID_MOVE, 
-                                      (col * SQUARE_SIZE + SQUARE_SIZE // 2, 
-                                       row * SQUARE_SIZE + SQUARE_SIZE // 2), 
-                                      SQUARE_SIZE // 6)
-                
-                # Draw the piece
-                piece = self.board[row][col]
-                if piece != ' ':
-                    piece_img = self.images[piece]
-                    self.screen.blit(piece_img, (col * SQUARE_SIZE, row * SQUARE_SIZE))
+        """Draw the squares that changed since the last frame, returning their rects"""
+        if not self.dirty:
+            return []
+        
+        if self.full_redraw:
+            # Lay down the whole board at once, then only the squares with content
+            self.screen.blit(self.board_bg, (0, 0))
+            rects = [self.screen.get_rect()]
+            content = self.bb['all_white'] | self.bb['all_black'] | self.valid_moves_bb
+            if self.selected_piece:
+                content |= square_bit(*self.selected_piece)
+            for row, col in bitboard_squares(content):
+                self.draw_square(row, col, clear=False)
+        else:
+            rects = [self.draw_square(row, col) for row, col in self.changed_squares]
+        
+        self.changed_squares = set()
+        self.dirty = False
+        return rects
+    
+    def render_game_over(self):
+        """Render the game over overlay and its text to a surface"""
+        # Create a semi-transparent overlay
+        overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
+        overlay.fill((0, 0, 0, 128))  # Semi-transparent black
+        
+        # Draw game over text
+        game_over_text = self.large_font.render('Game Over', True, WHITE)
+        winner_text = self.large_font.render(f'{self.winner.capitalize()} wins!', True, WHITE)
+        
+        overlay.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 60))
+        overlay.blit(winner_text, (WIDTH // 2 - winner_text.get_width() // 2, HEIGHT // 2))
+        
+        # Draw restart button
+        restart_text = self.medium_font.render('Click to Restart', True, WHITE)
+        overlay.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 60))
+        
+        return overlay
     
     def draw_game_over(self):
         """Draw game over message"""
         if self.game_over:
-            # Create a semi-transparent overlay
-            overlay = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            overlay.fill((0, 0, 0, 128))  # Semi-transparent black
-            self.screen.blit(overlay, (0, 0))
-            
-            # Draw game over text
-            font = pygame.font.SysFont('Arial', 48)
-            game_over_text = font.render('Game Over', True, WHITE)
-            winner_text = font.render(f'{self.winner.capitalize()} wins!', True, WHITE)
-            
-            self.screen.blit(game_over_text, (WIDTH // 2 - game_over_text.get_width() // 2, HEIGHT // 2 - 60))
-            self.screen.blit(winner_text, (WIDTH // 2 - winner_text.get_width() // 2, HEIGHT // 2))
-            
-            # Draw restart button
-            restart_font = pygame.font.SysFont('Arial', 32)
-            restart_text = restart_font.render('Click to Restart', True, WHITE)
-            self.screen.blit(restart_text, (WIDTH // 2 - restart_text.get_width() // 2, HEIGHT // 2 + 60))
+            self.screen.blit(self.game_over_surface, (0, 0))
 
     def run(self):
         """Main game loop"""
         running = True
         while running:
-            # Handle events
-            for event in pygame.event.get():
+            # Sleep until an event arrives, then handle everything that queued up
+            events = [pygame.event.wait(EVENT_TIMEOUT)] + pygame.event.get()
+            for event in events:
                 if event.type == pygame.QUIT:
                     running = False
                 
+                # Repaint everything when the window was uncovered
+                if event.type == pygame.WINDOWEXPOSED:
+                    self.full_redraw = True
+                    self.dirty = True
+                
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:  # Left click
                     # Get board coordinates from mouse position
                     mouse_pos = pygame.mouse.get_pos()
@@ -401,14 +669,16 @@ class ChessGame:
                     else:
                         self.handle_click(row, col)
             
-            # Draw everything
-            self.draw_board()
-            if self.game_over:
-                self.draw_game_over()
-            
-            # Update the display
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            # Repaint only what changed since the last frame
+            if self.dirty:
+                if self.full_redraw:
+                    self.draw_board()
+                    if self.game_over:
+                        self.draw_game_over()
+                    pygame.display.flip()
+                    self.full_redraw = False
+                else:
+                    pygame.display.update(self.draw_board())
         
         pygame.quit()
         sys.exit()